@@ -1,21 +1,105 @@
 import os
 import json
+import math
+import time
+import zlib
+import struct
 import random
+import asyncio
+import hashlib
+import argparse
+import ctypes
+import ctypes.util
+import tempfile
+import threading
+import contextlib
+import multiprocessing
+from array import array
+from collections import OrderedDict, deque
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 import turtle
 import colorsys
+import copy
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
 
 USERS_FILE = "users.json"
 PROJECTS_DIR = "projects"
 
 
+#storage
+#writers take an advisory lock on a hidden .<name>.lock next to the file and
+#replace it atomically, so readers never need the lock and never see half a file
+class SaveConflict(Exception):
+    def __init__(self, path, version):
+        super().__init__(f"{path} was saved elsewhere (now version {version})")
+        self.path = path
+        self.version = version
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    d, base = os.path.split(path)
+    with open(os.path.join(d, "." + base + ".lock"), "a+") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+#mkstemp files are 0600; the replacement keeps the old file's mode, or gets
+#the umask default a plain open() would have given a new one
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+def atomic_write_json(path, data):
+    d, base = os.path.split(path)
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_umask
+    fd, tmp = tempfile.mkstemp(dir=d or ".", prefix="." + base + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
 def ensure_dirs():
     if not os.path.exists(PROJECTS_DIR):
-        os.makedirs(PROJECTS_DIR)
+        os.makedirs(PROJECTS_DIR, exist_ok=True)
     if not os.path.exists(USERS_FILE):
-        with open(USERS_FILE, "w") as f:
-            json.dump({}, f)
+        with file_lock(USERS_FILE):
+            if not os.path.exists(USERS_FILE):
+                atomic_write_json(USERS_FILE, {})
 
 
 def load_users():
@@ -25,8 +109,40 @@ def load_users():
 
 
 def save_users(users):
-    with open(USERS_FILE, "w") as f:
-        json.dump(users, f, indent=2)
+    with file_lock(USERS_FILE):
+        atomic_write_json(USERS_FILE, users)
+
+
+def add_user(username, password):
+    #read-modify-write under the lock so concurrent registrations all land
+    ensure_dirs()
+    with file_lock(USERS_FILE):
+        users = load_users()
+        if username in users:
+            return False
+        users[username] = {"password": password}
+        atomic_write_json(USERS_FILE, users)
+    return True
+
+
+def load_project_file(path):
+    with open(path, "r") as f:
+        data = json.load(f)
+    return data.get("objects", []), data.get("version", 0)
+
+
+def save_project_file(path, objects, base_version=None):
+    #base_version is what the caller loaded, None for a file that shouldn't exist
+    #yet; anything else on disk means someone saved in between
+    with file_lock(path):
+        current = None
+        if os.path.exists(path):
+            current = load_project_file(path)[1]
+        if current != base_version:
+            raise SaveConflict(path, current)
+        version = (current or 0) + 1
+        atomic_write_json(path, {"version": version, "objects": objects})
+    return version
 
 
 def get_user_project_dir(username: str) -> str:
@@ -36,7 +152,1263 @@ def get_user_project_dir(username: str) -> str:
     return path
 
 
+#bulk transforms
+#per-type size keys; rectangles keep width/height on separate axes
+SCALE_KEYS = {
+    "square": ("size",),
+    "circle": ("size",),
+    "triangle": ("size",),
+    "star": ("size",),
+    "polygon": ("size",),
+    "spiral": ("start_length", "grow"),
+    "flower": ("radius",),
+    "mandala": ("step", "dot_radius"),
+    "grid": ("cell_size",),
+    "random_walk": ("step_len",),
+    "group": ("scale",),
+}
+
+
+#keys a saved object may omit; the rest default to 50 like size
+SCALE_DEFAULTS = {"scale": 1, "dot_radius": 5}
+
+
+def select_objects(objects, kind=None, types=None):
+    if isinstance(kind, str):
+        kind = (kind,)
+    return [
+        i
+        for i, o in enumerate(objects)
+        if (kind is None or o["kind"] in kind) and (types is None or o["type"] in types)
+    ]
+
+
+def _selected(objects, indices):
+    if indices is None:
+        return objects
+    return [objects[i] for i in indices]
+
+
+#positions live in the object dicts that compile_object, the geometry cache
+#and save/load all read, so a bulk op is one python pass over the selection,
+#not an array operation (no column store, no numpy)
+def translate_objects(objects, dx, dy, indices=None):
+    for o in _selected(objects, indices):
+        o["x"] += dx
+        o["y"] += dy
+
+
+def rotate_objects(objects, angle, pivot=None, indices=None):
+    #pivot None -> every object turns in place
+    sel = _selected(objects, indices)
+    for o in sel:
+        o["heading"] = (o.get("heading", 0) + angle) % 360
+
+    if pivot is None:
+        return
+
+    px, py = pivot
+    c = math.cos(math.radians(angle))
+    s = math.sin(math.radians(angle))
+    for o in sel:
+        x = o["x"] - px
+        y = o["y"] - py
+        o["x"] = px + x * c - y * s
+        o["y"] = py + x * s + y * c
+
+
+def scale_objects(objects, sx, sy=None, pivot=None, indices=None):
+    if sy is None:
+        sy = sx
+    #single-size types can't stretch, they take the area-equivalent factor
+    k = abs(sx) if sx == sy else math.sqrt(abs(sx * sy))
+
+    sel = _selected(objects, indices)
+    for o in sel:
+        if o["type"] == "rectangle":
+            o["width"] *= abs(sx)
+            o["height"] *= abs(sy)
+            continue
+        for key in SCALE_KEYS.get(o["type"], ()):
+            o[key] = o.get(key, SCALE_DEFAULTS.get(key, 50)) * k
+
+    if pivot is None:
+        return
+
+    px, py = pivot
+    for o in sel:
+        o["x"] = px + (o["x"] - px) * sx
+        o["y"] = py + (o["y"] - py) * sy
+
+
+#animation
+#frames the live animation plays for each mode
+ANIMATION_FRAMES = {
+    "rotate": 36,
+    "move": 25,
+    "expand": 15,
+    "contract": 15,
+    "blink": 10,
+    "color_cycle": 120,
+}
+
+
+def cycle_color(hue):
+    r, g, b = colorsys.hsv_to_rgb(hue / 360, 1, 1)
+    return "#%02x%02x%02x" % (int(r * 255), int(g * 255), int(b * 255))
+
+
+def animation_frame(objects, mode, i):
+    #state after i steps, evaluated from the start so frames are independent
+    objs = copy.deepcopy(objects)
+    if mode == "rotate":
+        rotate_objects(objs, 10 * i)
+    elif mode == "move":
+        translate_objects(objs, 10 * i, 0)
+    elif mode in ("expand", "contract"):
+        k = 1.05 if mode == "expand" else 0.95
+        shapes = select_objects(objs, kind=("shape", "group"))
+        scale_objects(objs, k**i, indices=shapes)
+    elif mode == "color_cycle":
+        rgb = cycle_color(3 * i % 360)
+        for o in walk_objects(objs):
+            if o["kind"] == "shape":
+                o["fill_color"] = rgb
+    elif mode == "blink":
+        if i % 2 == 0:
+            return []
+    else:
+        raise ValueError(f"unknown animation: {mode}")
+    return objs
+
+
+#geometry
+#records what the turtle would draw as flat coordinate lists:
+#("fill", coords, color, 0) and ("line", coords, color, width)
+class PathPen:
+    def __init__(self, x=0.0, y=0.0, heading=0.0):
+        self.x = x
+        self.y = y
+        self.heading = heading
+        self.path = None
+        self.fill_path = None
+        self.paths = []
+        self.fills = []
+
+    def penup(self):
+        self.path = None
+
+    def pendown(self):
+        if self.path is None:
+            self.path = [self.x, self.y]
+            self.paths.append(self.path)
+
+    def goto(self, x, y):
+        self.x = x
+        self.y = y
+        if self.path is not None:
+            self.path += (x, y)
+        if self.fill_path is not None:
+            self.fill_path += (x, y)
+
+    def setheading(self, a):
+        self.heading = a
+
+    def left(self, a):
+        self.heading += a
+
+    def right(self, a):
+        self.heading -= a
+
+    def forward(self, d):
+        r = math.radians(self.heading)
+        self.goto(self.x + d * math.cos(r), self.y + d * math.sin(r))
+
+    #same step count as turtle.circle
+    def circle(self, radius, extent=360):
+        steps = 1 + int(min(11 + abs(radius) / 6.0, 59.0) * abs(extent) / 360)
+        w = extent / steps
+        l = 2.0 * radius * math.sin(math.radians(w / 2))
+        if radius < 0:
+            l, w = -l, -w
+        self.left(w / 2)
+        for _ in range(steps):
+            self.forward(l)
+            self.left(w)
+        self.left(-w / 2)
+
+    def begin_fill(self):
+        self.fill_path = [self.x, self.y]
+
+    def end_fill(self):
+        self.fills.append(self.fill_path)
+        self.fill_path = None
+
+
+def tessellate_shape(o):
+    pen = PathPen()
+    pen.pendown()
+    size = o.get("size", 50)
+
+    st = o["type"]
+    if st == "square":
+        for i in range(4):
+            pen.forward(size)
+            pen.right(90)
+    elif st == "rectangle":
+        for i in range(2):
+            pen.forward(o["width"])
+            pen.right(90)
+            pen.forward(o["height"])
+            pen.right(90)
+    elif st == "circle":
+        pen.circle(size)
+    elif st == "triangle":
+        for i in range(3):
+            pen.forward(size)
+            pen.left(120)
+    elif st == "star":
+        for i in range(5):
+            pen.forward(size)
+            pen.right(144)
+    elif st == "polygon":
+        ang = 360 / o["sides"]
+        for i in range(o["sides"]):
+            pen.forward(size)
+            pen.right(ang)
+
+    #outline and fill share the one path
+    return pen.paths
+
+
+def tessellate_pattern(p):
+    pen = PathPen()
+    pen.pendown()
+    typ = p["type"]
+
+    if typ == "spiral":
+        L = p["start_length"]
+        for _ in range(p["repeat"]):
+            pen.forward(L)
+            pen.right(p["turn_angle"])
+            L += p["grow"]
+
+    elif typ == "flower":
+        for _ in range(p["petals"]):
+            for _ in range(2):
+                pen.circle(p["radius"], 60)
+                pen.left(120)
+            pen.left(360 / p["petals"])
+
+    elif typ == "mandala":
+        for i in range(p["layers"]):
+            r = (i + 1) * p["step"]
+            for j in range(p["circles"]):
+                pen.penup()
+                pen.goto(0, 0)
+                pen.setheading(360 * j / p["circles"])
+                pen.forward(r)
+                pen.pendown()
+                pen.circle(p.get("dot_radius", 5))
+
+    elif typ == "grid":
+        rows = p["rows"]
+        cols = p["cols"]
+        cell = p["cell_size"]
+        for r in range(rows + 1):
+            pen.penup()
+            pen.goto(0, -r * cell)
+            pen.pendown()
+            pen.forward(cols * cell)
+        for c in range(cols + 1):
+            pen.penup()
+            pen.goto(c * cell, 0)
+            pen.pendown()
+            pen.setheading(-90)
+            pen.forward(rows * cell)
+
+    elif typ == "random_walk":
+        seed = p.get("seed")
+        rng = random.Random(walk_seed(p) if seed is None else seed)
+        for _ in range(p["steps"]):
+            pen.setheading(rng.choice([0, 90, 180, 270]))
+            pen.forward(p["step_len"])
+
+    return [path for path in pen.paths if len(path) > 2]
+
+
+def tessellate(o):
+    if o["kind"] == "shape":
+        return tessellate_shape(o)
+    return tessellate_pattern(o)
+
+
+#placement and styling; everything else decides the tessellated paths
+NON_GEOMETRY_KEYS = {
+    "x",
+    "y",
+    "heading",
+    "fill_color",
+    "pen_color",
+    "pen_thickness",
+    "color",
+}
+
+
+def geometry_key(o):
+    return tuple(sorted((k, v) for k, v in o.items() if k not in NON_GEOMETRY_KEYS))
+
+
+#walks saved before seeds existed (and external jobs) get one derived from
+#their parameters, so every process draws the same walk; hash() and an
+#unseeded Random differ per process
+def walk_seed(p):
+    return zlib.crc32(repr(geometry_key(p)).encode()) % (1 << 30)
+
+
+def seed_walks(objects):
+    #on load; identical unseeded walks get consecutive seeds so they differ
+    seen = {}
+    for o in walk_objects(objects):
+        if o["type"] == "random_walk" and o.get("seed") is None:
+            base = walk_seed(o)
+            n = seen.get(base, 0)
+            seen[base] = n + 1
+            o["seed"] = (base + n) % (1 << 30)
+
+
+#(a, b, c, d, e, f): x' = a*x + c*y + e, y' = b*x + d*y + f
+def node_affine(o):
+    r = math.radians(o.get("heading", 0))
+    k = o.get("scale", 1)
+    c = k * math.cos(r)
+    s = k * math.sin(r)
+    return (c, s, -s, c, o["x"], o["y"])
+
+
+def compose_affine(m, n):
+    a, b, c, d, e, f = m
+    A, B, C, D, E, F = n
+    return (
+        a * A + c * B,
+        b * A + d * B,
+        a * C + c * D,
+        b * C + d * D,
+        a * E + c * F + e,
+        b * E + d * F + f,
+    )
+
+
+def apply_affine(coords, m):
+    a, b, c, d, e, f = m
+    xs = coords[0::2]
+    ys = coords[1::2]
+    out = [0.0] * len(coords)
+    out[0::2] = [a * x + c * y + e for x, y in zip(xs, ys)]
+    out[1::2] = [b * x + d * y + f for x, y in zip(xs, ys)]
+    return out
+
+
+class GeometryCache:
+    def __init__(self, max_vertices=2_000_000):
+        self.max_vertices = max_vertices
+        self.entries = OrderedDict()
+        self.vertices = 0
+        self.hits = 0
+        self.misses = 0
+        #the canvas prefetches from a background thread
+        self.lock = threading.Lock()
+
+    def get(self, o):
+        key = geometry_key(o)
+        with self.lock:
+            paths = self.entries.get(key)
+            if paths is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return paths
+            self.misses += 1
+        paths = tessellate(o)
+        self.put(key, paths)
+        return paths
+
+    def put(self, key, paths):
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = paths
+            self.vertices += sum(len(p) for p in paths) // 2
+            #LRU by vertex count, always keep the newest entry
+            while self.vertices > self.max_vertices and len(self.entries) > 1:
+                _, old = self.entries.popitem(last=False)
+                self.vertices -= sum(len(p) for p in old) // 2
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "vertices": self.vertices,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+#shared by the design canvas, gallery preview and exporters
+GEOMETRY_CACHE = GeometryCache()
+
+
+#parallel tessellation
+#big scenes are tessellated in a process pool; vertex buffers come back
+#through shared memory and only the small per-object layout is pickled
+PARALLEL_MIN_OBJECTS = 5000
+TESSELLATE_WORKERS = os.cpu_count() or 2
+_tessellate_pool = None
+#set in every pool worker; a worker never starts a nested tessellation pool
+_pool_worker = False
+
+
+def _init_worker():
+    global _pool_worker
+    _pool_worker = True
+
+
+def _get_tessellate_pool():
+    global _tessellate_pool
+    if _tessellate_pool is None:
+        _tessellate_pool = ProcessPoolExecutor(
+            TESSELLATE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _tessellate_pool
+
+
+#blocks start with an 8-byte header whose first byte the parent sets once it
+#has copied the vertices out. Windows frees a mapping with its last handle,
+#so there the worker keeps its handle open until it sees that byte
+_held_blocks = []
+
+
+def _release_held_blocks():
+    for shm in _held_blocks[:]:
+        if shm.buf[0]:
+            _held_blocks.remove(shm)
+            shm.close()
+
+
+def _free_block(shm):
+    shm.buf[0] = 1
+    shm.close()
+    shm.unlink()
+
+
+def _tessellate_chunk(objects):
+    _release_held_blocks()
+    buf = array("d")
+    layout = []
+    for o in objects:
+        lens = []
+        for path in tessellate(o):
+            buf.extend(path)
+            lens.append(len(path))
+        layout.append(lens)
+
+    shm = shared_memory.SharedMemory(create=True, size=8 + len(buf) * 8)
+    shm.buf[0] = 0
+    shm.buf[8 : 8 + len(buf) * 8] = memoryview(buf).cast("B")
+    name = shm.name
+    if os.name == "nt":
+        _held_blocks.append(shm)
+    else:
+        shm.close()
+    return name, layout
+
+
+def prefetch_geometry(objects, cache=None):
+    if cache is None:
+        cache = GEOMETRY_CACHE
+    if _pool_worker:
+        return
+    leaves = [o for o in walk_objects(objects) if o["kind"] != "group"]
+    if len(leaves) < PARALLEL_MIN_OBJECTS:
+        return
+
+    missing = {}
+    for o in leaves:
+        key = geometry_key(o)
+        if key not in cache.entries and key not in missing:
+            missing[key] = o
+    if len(missing) < PARALLEL_MIN_OBJECTS:
+        return
+
+    keys = list(missing)
+    objs = list(missing.values())
+    size = -(-len(objs) // (TESSELLATE_WORKERS * 4))
+    pool = _get_tessellate_pool()
+    jobs = [
+        (i, pool.submit(_tessellate_chunk, objs[i : i + size]))
+        for i in range(0, len(objs), size)
+    ]
+
+    cache.misses += len(keys)
+    done = 0
+    try:
+        for start, fut in jobs:
+            done += 1
+            name, layout = fut.result()
+            shm = shared_memory.SharedMemory(name=name)
+            try:
+                data = shm.buf[8:]
+                mv = data.cast("d")
+                pos = 0
+                for key, lens in zip(keys[start : start + size], layout):
+                    paths = []
+                    for n in lens:
+                        paths.append(mv[pos : pos + n].tolist())
+                        pos += n
+                    cache.put(key, paths)
+                mv.release()
+                data.release()
+            finally:
+                _free_block(shm)
+    finally:
+        #a failed chunk mustn't leak the blocks the later chunks already made
+        for _, fut in jobs[done:]:
+            if fut.cancel():
+                continue
+            try:
+                name = fut.result()[0]
+            except Exception:
+                continue
+            _free_block(shared_memory.SharedMemory(name=name))
+
+
+#m is the parent's transform; groups pass theirs down so each leaf's
+#cached paths are transformed once
+def compile_object(o, cache=None, m=None):
+    if cache is None:
+        cache = GEOMETRY_CACHE
+    m = node_affine(o) if m is None else compose_affine(m, node_affine(o))
+
+    if o["kind"] == "group":
+        items = []
+        for child in o["children"]:
+            items += compile_object(child, cache, m)
+        return items
+
+    world = [apply_affine(p, m) for p in cache.get(o)]
+
+    if o["kind"] == "shape":
+        items = []
+        fill = o.get("fill_color", "")
+        if fill:
+            items.append(("fill", world[0], fill, 0))
+        pen = o.get("pen_color", "black")
+        items.append(("line", world[0], pen, o.get("pen_thickness", 2)))
+        return items
+
+    color = o.get("color", "blue")
+    return [("line", path, color, 1) for path in world]
+
+
+#scene graph
+#{"kind": "group", "type": "group", "x", "y", "heading", "scale", "children"};
+#children live in the group's local space
+def walk_objects(objects):
+    for o in objects:
+        yield o
+        if o["kind"] == "group":
+            yield from walk_objects(o["children"])
+
+
+def coords_bbox(coords):
+    if not coords:
+        return None
+    xs = coords[0::2]
+    ys = coords[1::2]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+def make_group(members, x=0.0, y=0.0):
+    children = copy.deepcopy(members)
+    translate_objects(children, -x, -y)
+    return {
+        "kind": "group",
+        "type": "group",
+        "x": x,
+        "y": y,
+        "heading": 0,
+        "scale": 1.0,
+        "children": children,
+    }
+
+
+def ungroup(g):
+    #children with the group's transform baked in
+    m = node_affine(g)
+    children = copy.deepcopy(g["children"])
+    for ch in children:
+        ch["x"], ch["y"] = apply_affine([ch["x"], ch["y"]], m)
+    rotate_objects(children, g.get("heading", 0))
+    if g.get("scale", 1) != 1:
+        scale_objects(children, g["scale"])
+    return children
+
+
+class SceneBounds:
+    #each node's box in its parent's space (world space at the top level),
+    #cached until the node or one of its descendants is invalidated
+    def __init__(self):
+        self.boxes = {}
+        self.parents = {}
+
+    def clear(self):
+        self.boxes.clear()
+        self.parents.clear()
+
+    def forget(self, o):
+        #o left the scene, drop its box and its descendants'
+        for n in walk_objects([o]):
+            self.boxes.pop(id(n), None)
+            self.parents.pop(id(n), None)
+
+    def bounds(self, o):
+        e = self.boxes.get(id(o))
+        if e and e[0] is o:
+            return e[1]
+
+        if o["kind"] == "group":
+            corners = []
+            for child in o["children"]:
+                self.parents[id(child)] = (child, o)
+                b = self.bounds(child)
+                if b:
+                    corners += [b[0], b[1], b[2], b[1], b[2], b[3], b[0], b[3]]
+            box = coords_bbox(apply_affine(corners, node_affine(o)))
+        else:
+            coords = []
+            for _, c, _, _ in compile_object(o):
+                coords += c
+            box = coords_bbox(coords)
+
+        self.boxes[id(o)] = (o, box)
+        return box
+
+    def invalidate(self, o):
+        #only o and its ancestors change, siblings and children keep their boxes
+        while o is not None:
+            self.boxes.pop(id(o), None)
+            e = self.parents.get(id(o))
+            o = e[1] if e and e[0] is o else None
+
+    def hit(self, o, x, y):
+        b = self.bounds(o)
+        if not b or not (b[0] <= x <= b[2] and b[1] <= y <= b[3]):
+            return False
+        if o["kind"] != "group":
+            return True
+
+        #into the group's local space, then the children front to back
+        a, b, c, d, e, f = node_affine(o)
+        det = a * d - b * c
+        if det == 0:
+            return False
+        lx = (d * (x - e) - c * (y - f)) / det
+        ly = (a * (y - f) - b * (x - e)) / det
+        return any(self.hit(ch, lx, ly) for ch in reversed(o["children"]))
+
+
+#headless render
+COLOR_NAMES = {
+    "white": (255, 255, 255),
+    "black": (0, 0, 0),
+    "red": (255, 0, 0),
+    "green": (0, 128, 0),
+    "blue": (0, 0, 255),
+    "yellow": (255, 255, 0),
+    "cyan": (0, 255, 255),
+    "magenta": (255, 0, 255),
+    "orange": (255, 165, 0),
+    "purple": (128, 0, 128),
+    "pink": (255, 192, 203),
+    "brown": (165, 42, 42),
+    "gray": (128, 128, 128),
+    "grey": (128, 128, 128),
+    "darkgray": (169, 169, 169),
+    "darkgrey": (169, 169, 169),
+    "lightgray": (211, 211, 211),
+    "lightgrey": (211, 211, 211),
+    "gold": (255, 215, 0),
+    "navy": (0, 0, 128),
+    "maroon": (128, 0, 0),
+    "violet": (238, 130, 238),
+    "indigo": (75, 0, 130),
+    "turquoise": (64, 224, 208),
+    "teal": (0, 128, 128),
+    "olive": (128, 128, 0),
+    "lime": (0, 255, 0),
+    "salmon": (250, 128, 114),
+    "coral": (255, 127, 80),
+    "tomato": (255, 99, 71),
+    "skyblue": (135, 206, 235),
+    "lightblue": (173, 216, 230),
+    "darkblue": (0, 0, 139),
+    "darkgreen": (0, 100, 0),
+    "lightgreen": (144, 238, 144),
+    "darkred": (139, 0, 0),
+    "beige": (245, 245, 220),
+    "khaki": (240, 230, 140),
+    "silver": (192, 192, 192),
+    "chocolate": (210, 105, 30),
+    "crimson": (220, 20, 60),
+}
+
+
+def parse_color(c):
+    c = c.strip()
+    if c.startswith("#") and len(c) in (4, 7, 10, 13):
+        n = (len(c) - 1) // 3
+        try:
+            parts = [int(c[1 + i * n : 1 + (i + 1) * n], 16) for i in range(3)]
+        except ValueError:
+            raise ValueError(f"invalid color: {c!r}")
+        top = 16**n - 1
+        return tuple(round(v * 255 / top) for v in parts)
+    key = c.lower().replace(" ", "")
+    if key in COLOR_NAMES:
+        return COLOR_NAMES[key]
+    raise ValueError(f"invalid color: {c!r}")
+
+
+#color strings are resolved once (on create/load) to "#rrggbb" and stored
+#that way, so every renderer can parse them. widget lets Tk resolve names
+#the headless table doesn't carry ("dark olive green", "lavender", ...)
+COLOR_CACHE = {"": ""}
+
+
+def resolve_color(c, widget=None):
+    hexc = COLOR_CACHE.get(c)
+    if hexc is not None:
+        return hexc
+    try:
+        rgb = parse_color(c)
+    except ValueError:
+        if widget is None:
+            raise
+        try:
+            r, g, b = widget.winfo_rgb(c)
+        except tk.TclError:
+            raise ValueError(f"invalid color: {c!r}")
+        rgb = (r >> 8, g >> 8, b >> 8)
+    hexc = COLOR_CACHE[c] = "#%02x%02x%02x" % rgb
+    return hexc
+
+
+def resolve_colors(objects, widget=None):
+    for o in walk_objects(objects):
+        for key in ("fill_color", "pen_color", "color"):
+            c = o.get(key)
+            if c is not None:
+                o[key] = resolve_color(c, widget)
+
+
+def validate_colors(objects, widget=None):
+    for o in walk_objects(objects):
+        for key in ("fill_color", "pen_color", "color"):
+            c = o.get(key)
+            if c is not None:
+                resolve_color(c, widget)
+
+
+def _fill_polygon(buf, width, height, pts, px):
+    #even-odd scanline fill, same rule Tk uses for polygons
+    n = len(pts) // 2
+    if n < 3:
+        return
+    edges = []
+    ymin = ymax = pts[1]
+    for i in range(n):
+        ax, ay = pts[2 * i - 2], pts[2 * i - 1]
+        bx, by = pts[2 * i], pts[2 * i + 1]
+        ymin = min(ymin, by)
+        ymax = max(ymax, by)
+        if ay == by:
+            continue
+        if ay > by:
+            ax, ay, bx, by = bx, by, ax, ay
+        edges.append((ay, by, ax, (bx - ax) / (by - ay)))
+
+    y0 = max(math.ceil(ymin - 0.5), 0)
+    y1 = min(math.floor(ymax - 0.5), height - 1)
+    bpp = len(px)
+    for y in range(y0, y1 + 1):
+        cy = y + 0.5
+        xs = sorted(ax + (cy - ay) * k for ay, by, ax, k in edges if ay <= cy < by)
+        off = y * width * bpp
+        for i in range(0, len(xs) - 1, 2):
+            a = max(math.ceil(xs[i] - 0.5), 0)
+            b = min(math.ceil(xs[i + 1] - 0.5), width)
+            if a < b:
+                buf[off + bpp * a : off + bpp * b] = px * (b - a)
+
+
+def _stroke(buf, width, height, pts, px, w):
+    #each segment as a quad, plus a square at each joint
+    h = max(w, 1) / 2
+    for i in range(0, len(pts) - 2, 2):
+        ax, ay, bx, by = pts[i], pts[i + 1], pts[i + 2], pts[i + 3]
+        d = math.hypot(bx - ax, by - ay)
+        if d == 0:
+            continue
+        nx = (ay - by) / d * h
+        ny = (bx - ax) / d * h
+        quad = [ax + nx, ay + ny, bx + nx, by + ny, bx - nx, by - ny, ax - nx, ay - ny]
+        _fill_polygon(buf, width, height, quad, px)
+    if w > 2:
+        for i in range(0, len(pts), 2):
+            x, y = pts[i], pts[i + 1]
+            sq = [x - h, y - h, x + h, y - h, x + h, y + h, x - h, y + h]
+            _fill_polygon(buf, width, height, sq, px)
+
+
+#pixel(color) -> bytes for one pixel, so the same pass fills RGB or palette indices
+def rasterize(objects, width, height, bg, scale, pixel):
+    buf = bytearray(pixel(bg) * (width * height))
+    prefetch_geometry(objects)
+    cx = width / 2
+    cy = height / 2
+    pixels = {}
+    for o in objects:
+        for kind, coords, color, w in compile_object(o):
+            if not color:
+                continue
+            pts = [
+                cx + v * scale if i % 2 == 0 else cy - v * scale
+                for i, v in enumerate(coords)
+            ]
+            px = pixels.get(color)
+            if px is None:
+                px = pixels[color] = pixel(color)
+            if kind == "fill":
+                _fill_polygon(buf, width, height, pts, px)
+            else:
+                _stroke(buf, width, height, pts, px, w * scale)
+    return buf
+
+
+def render_rgb(objects, width=850, height=600, bg="white", scale=1.0):
+    return rasterize(
+        objects,
+        width,
+        height,
+        bg,
+        scale,
+        lambda c: bytes(parse_color(resolve_color(c))),
+    )
+
+
+def render_indexed(objects, width=850, height=600, bg="white", scale=1.0):
+    palette = {}
+
+    def pixel(c):
+        rgb = parse_color(resolve_color(c))
+        if rgb not in palette:
+            if len(palette) < 256:
+                palette[rgb] = len(palette)
+            else:
+                near = min(
+                    palette, key=lambda p: sum((a - b) ** 2 for a, b in zip(p, rgb))
+                )
+                palette[rgb] = palette[near]
+        return bytes([palette[rgb]])
+
+    buf = rasterize(objects, width, height, bg, scale, pixel)
+    table = bytearray()
+    for rgb, i in palette.items():
+        if i * 3 == len(table):
+            table += bytes(rgb)
+    return buf, bytes(table)
+
+
+def encode_png(width, height, rgb):
+    stride = width * 3
+    raw = b"".join(
+        b"\x00" + bytes(rgb[y * stride : (y + 1) * stride]) for y in range(height)
+    )
+
+    def chunk(tag, data):
+        crc = zlib.crc32(tag + data) & 0xFFFFFFFF
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", crc)
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", ihdr)
+        + chunk(b"IDAT", zlib.compress(raw, 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def render_png(objects, width=850, height=600, bg="white", scale=1.0):
+    return encode_png(width, height, render_rgb(objects, width, height, bg, scale))
+
+
+def lzw_encode(data, min_size=8):
+    clear = 1 << min_size
+    eoi = clear + 1
+    out = bytearray()
+    acc = clear
+    nacc = size = min_size + 1
+    table = {}
+    nxt = eoi + 1
+
+    prefix = data[0]
+    for c in data[1:]:
+        key = prefix << 8 | c
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        acc |= prefix << nacc
+        nacc += size
+        while nacc >= 8:
+            out.append(acc & 0xFF)
+            acc >>= 8
+            nacc -= 8
+        if nxt < 4096:
+            table[key] = nxt
+            nxt += 1
+            #the decoder grows one code later than we do
+            if nxt > 1 << size and size < 12:
+                size += 1
+        else:
+            acc |= clear << nacc
+            nacc += size
+            table = {}
+            nxt = eoi + 1
+            size = min_size + 1
+        prefix = c
+
+    acc |= prefix << nacc
+    nacc += size
+    if nxt == 1 << size and size < 12:
+        size += 1
+    acc |= eoi << nacc
+    nacc += size
+    while nacc > 0:
+        out.append(acc & 0xFF)
+        acc >>= 8
+        nacc -= 8
+    return bytes(out)
+
+
+def gif_frame(width, height, indexed, palette, delay):
+    #graphic control + image descriptor with a 256-entry local color table
+    table = palette.ljust(768, b"\x00")
+    data = lzw_encode(indexed)
+    blocks = b"".join(
+        bytes([len(data[i : i + 255])]) + data[i : i + 255]
+        for i in range(0, len(data), 255)
+    )
+    return (
+        b"\x21\xf9\x04\x04" + struct.pack("<H", delay) + b"\x00\x00"
+        + b"\x2c" + struct.pack("<HHHH", 0, 0, width, height) + b"\x87"
+        + table + b"\x08" + blocks + b"\x00"
+    )
+
+
+def gif_header(width, height, loop=0):
+    return (
+        b"GIF89a" + struct.pack("<HH", width, height) + b"\x00\x00\x00"
+        + b"\x21\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", loop) + b"\x00"
+    )
+
+
+#gallery index
+#projects/<user>/.index.json holds metadata per project file so the
+#gallery can list, sort and filter without opening the projects
+INDEX_FILE = ".index.json"
+THUMBS_DIR = ".thumbs"
+GALLERY_SORTS = ["name", "modified", "size", "objects"]
+
+
+def project_files(user_dir):
+    return [
+        f for f in os.listdir(user_dir) if f.endswith(".json") and not f.startswith(".")
+    ]
+
+
+def project_bbox(objects):
+    xs = []
+    ys = []
+    for o in objects:
+        for _, coords, _, _ in compile_object(o):
+            xs += coords[0::2]
+            ys += coords[1::2]
+    if not xs:
+        return None
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+def project_metadata(user_dir, fname, objects, widget=None):
+    st = os.stat(os.path.join(user_dir, fname))
+    seed_walks(objects)
+    types = {}
+    colors = {}
+    for o in walk_objects(objects):
+        types[o["type"]] = types.get(o["type"], 0) + 1
+        for key in ("fill_color", "pen_color", "color"):
+            c = o.get(key)
+            if c:
+                colors[c] = colors.get(c, 0) + 1
+
+    #a project the thumbnailer can't measure or draw (bad color, zero-sided
+    #polygon, ...) is still indexed, just without a box or thumbnail
+    os.makedirs(os.path.join(user_dir, THUMBS_DIR), exist_ok=True)
+    thumb = os.path.join(THUMBS_DIR, os.path.splitext(fname)[0] + ".png")
+    try:
+        validate_colors(objects, widget)
+        bbox = project_bbox(objects)
+        png = render_png(objects, 170, 120, scale=0.2)
+    except Exception:
+        if os.path.exists(os.path.join(user_dir, thumb)):
+            os.remove(os.path.join(user_dir, thumb))
+        bbox = thumb = None
+    else:
+        with open(os.path.join(user_dir, thumb), "wb") as f:
+            f.write(png)
+
+    return {
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "objects": len(objects),
+        "types": types,
+        "bbox": bbox,
+        "colors": sorted(colors, key=colors.get, reverse=True)[:3],
+        "thumbnail": thumb,
+    }
+
+
+def load_index(user_dir):
+    try:
+        with open(os.path.join(user_dir, INDEX_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+#None for anything that isn't a readable project (not JSON, not an object,
+#malformed objects, gone): it is left out of the index instead of failing
+#the whole gallery
+def read_metadata(user_dir, fname, objects=None, widget=None):
+    try:
+        if objects is None:
+            objects = load_project_file(os.path.join(user_dir, fname))[0]
+        return project_metadata(user_dir, fname, objects, widget)
+    except Exception:
+        return None
+
+
+def update_index_entry(user_dir, fname, objects=None, index=None, widget=None):
+    meta = read_metadata(user_dir, fname, objects, widget)
+    if meta is None:
+        return remove_index_entry(user_dir, fname, index)
+
+    #merge into the index on disk, other instances may have added entries
+    path = os.path.join(user_dir, INDEX_FILE)
+    with file_lock(path):
+        disk = load_index(user_dir)
+        disk[fname] = meta
+        atomic_write_json(path, disk)
+    if index is not None:
+        index[fname] = meta
+    return disk
+
+
+def drop_index_entry(user_dir, index, fname):
+    meta = index.pop(fname, None)
+    if meta and meta["thumbnail"]:
+        thumb = os.path.join(user_dir, meta["thumbnail"])
+        if os.path.exists(thumb):
+            os.remove(thumb)
+
+
+def remove_index_entry(user_dir, fname, index=None):
+    #same merge as update_index_entry, so other instances' entries survive
+    path = os.path.join(user_dir, INDEX_FILE)
+    with file_lock(path):
+        disk = load_index(user_dir)
+        if fname in disk:
+            drop_index_entry(user_dir, disk, fname)
+            atomic_write_json(path, disk)
+    if index is not None:
+        drop_index_entry(user_dir, index, fname)
+    return disk
+
+
+def index_is_current(user_dir, index, fname):
+    meta = index.get(fname)
+    try:
+        st = os.stat(os.path.join(user_dir, fname))
+    except OSError:
+        return False
+    return bool(meta) and meta["mtime"] == st.st_mtime and meta["size"] == st.st_size
+
+
+def scan_index(user_dir, widget=None):
+    #only files whose mtime or size moved since they were indexed get parsed
+    index = load_index(user_dir)
+    files = project_files(user_dir)
+    updated = {}
+
+    for fname in files:
+        if index_is_current(user_dir, index, fname):
+            continue
+        updated[fname] = read_metadata(user_dir, fname, widget=widget)
+    gone = set(index) - set(files)
+
+    if not updated and not gone:
+        return index
+
+    #merge into the index on disk, other instances may have written entries
+    path = os.path.join(user_dir, INDEX_FILE)
+    with file_lock(path):
+        disk = load_index(user_dir)
+        for fname, meta in updated.items():
+            if meta is None:
+                disk.pop(fname, None)
+            else:
+                disk[fname] = meta
+        for fname in gone:
+            drop_index_entry(user_dir, disk, fname)
+        atomic_write_json(path, disk)
+    return disk
+
+
+def gallery_names(index, sort="name", query="", widget=None):
+    q = query.strip().lower()
+
+    #colors are stored as "#rrggbb", so a name in the query matches by value
+    def rgb(c):
+        try:
+            return resolve_color(c, widget)
+        except ValueError:
+            return None
+
+    qc = rgb(q) if q else None
+    names = [
+        f
+        for f, m in index.items()
+        if not q
+        or q in f.lower()
+        or q in m["types"]
+        or any(q == c.lower() or (qc and rgb(c) == qc) for c in m["colors"])
+    ]
+    if sort == "name":
+        return sorted(names, key=str.lower)
+    key = {"modified": "mtime", "size": "size", "objects": "objects"}[sort]
+    return sorted(names, key=lambda f: index[f][key], reverse=True)
+
+
+#directory watching
+#inotify on Linux, otherwise a stat snapshot diffed on every poll();
+#poll() never blocks and returns [(event, fname)] for project files
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_INTERVAL_MS = 500
+
+
+class DirectoryWatcher:
+    def __init__(self, path):
+        self.path = path
+        self.known = self.snapshot()
+        self.fd = None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+            if fd >= 0 and libc.inotify_add_watch(fd, path.encode(), mask) >= 0:
+                self.fd = fd
+            elif fd >= 0:
+                os.close(fd)
+        except (OSError, AttributeError, TypeError):
+            pass
+
+    def snapshot(self):
+        snap = {}
+        with os.scandir(self.path) as it:
+            for e in it:
+                if e.name.endswith(".json") and not e.name.startswith("."):
+                    st = e.stat()
+                    snap[e.name] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def poll(self):
+        if self.fd is None:
+            return self.poll_stat()
+
+        changes = {}
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos < len(data):
+                _, mask, _, n = struct.unpack_from("iIII", data, pos)
+                name = os.fsdecode(data[pos + 16 : pos + 16 + n].split(b"\0", 1)[0])
+                pos += 16 + n
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                elif name.endswith(".json") and not name.startswith("."):
+                    changes[name] = not mask & (IN_MOVED_FROM | IN_DELETE)
+
+        #the kernel queue dropped events, diff a fresh snapshot instead
+        if overflow:
+            return self.poll_stat()
+
+        events = []
+        for name, exists in changes.items():
+            if not exists:
+                if name in self.known:
+                    del self.known[name]
+                    events.append(("deleted", name))
+            elif name in self.known:
+                events.append(("modified", name))
+            else:
+                self.known[name] = None
+                events.append(("added", name))
+        return events
+
+    def poll_stat(self):
+        snap = self.snapshot()
+        events = [("deleted", f) for f in self.known if f not in snap]
+        for f, sig in snap.items():
+            if f not in self.known:
+                events.append(("added", f))
+            elif self.known[f] != sig:
+                events.append(("modified", f))
+        self.known = snap
+        return events
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
 #canvas
+REDRAW_SLICE_MS = 8
+#one background thread keys the scene and waits on the tessellation pool
+#while the Tk thread draws
+_prefetch_thread = ThreadPoolExecutor(1)
+
+
 class TurtleCanvasManager:
     def __init__(self, parent):
         self.canvas = tk.Canvas(
@@ -47,138 +1419,79 @@ class TurtleCanvasManager:
         self.screen = turtle.TurtleScreen(self.canvas)
         self.screen.bgcolor("white")
 
-        self.t = turtle.RawTurtle(self.screen)
-        self.t.hideturtle()
-        self.t.speed(0)
         self.screen.tracer(0)
 
+        self.objects = []
+        self.pos = 0
+        self.job = None
+        self.prefetch = None
+        self.styles = {}
+
     def reset(self):
-        self.t.clear()
-        self.t.penup()
-        self.t.hideturtle()
+        #any reset supersedes a redraw still in flight
+        if self.job:
+            self.canvas.after_cancel(self.job)
+            self.job = None
+        self.canvas.delete("shape")
 
     def clear(self):
-        self.t.clear()
+        self.reset()
         self.screen.update()
 
-    def draw_shape(self, cordinate):
-        t = self.t
-        t.penup()
-        t.goto(cordinate["x"], cordinate["y"])
-        t.setheading(cordinate.get("heading", 0))
-        t.pendown()
-
-        size = cordinate.get("size", 50)
-        fill = cordinate.get("fill_color", "")
-        pen = cordinate.get("pen_color", "black")
-        thick = cordinate.get("pen_thickness", 2)
-
-        t.color(pen, fill)
-        t.pensize(thick)
-
-        if fill:
-            t.begin_fill()
-
-        st = cordinate["type"]
-
-        if st == "square":
-            for i in range(4):
-                t.forward(size)
-                t.right(90)
-        elif st == "rectangle":
-            w = cordinate["width"]
-            h = cordinate["height"]
-            for i in range(2):
-                t.forward(w)
-                t.right(90)
-                t.forward(h)
-                t.right(90)
-
-        elif st == "circle":
-            t.circle(size)
-
-        elif st == "triangle":
-            for i in range(3):
-                t.forward(size)
-                t.left(120)
-
-        elif st == "star":
-            for i in range(5):
-                t.forward(size)
-                t.right(144)
-
-        elif st == "polygon":
-            sides = cordinate["sides"]
-            ang = 360 / sides
-            for i in range(sides):
-                t.forward(size)
-                t.right(ang)
-
-        if fill:
-            t.end_fill()
-
-        t.penup()
-
-    def draw_pattern(self, p):
-        t = self.t
-        t.penup()
-        t.goto(p["x"], p["y"])
-        t.setheading(p.get("heading", 0))
-        t.pendown()
-
-        t.color(p.get("color", "blue"))
-        typ = p["type"]
-
-        if typ == "spiral":
-            L = p["start_length"]
-            for _ in range(p["repeat"]):
-                t.forward(L)
-                t.right(p["turn_angle"])
-                L += p["grow"]
-
-        elif typ == "flower":
-            for _ in range(p["petals"]):
-                for _ in range(2):
-                    t.circle(p["radius"], 60)
-                    t.left(120)
-                t.left(360 / p["petals"])
-
-        elif typ == "mandala":
-            for i in range(p["layers"]):
-                r = (i + 1) * p["step"]
-                for j in range(p["circles"]):
-                    t.penup()
-                    t.goto(0, 0)
-                    t.setheading(360 * j / p["circles"])
-                    t.forward(r)
-                    t.pendown()
-                    t.circle(5)
-
-        elif typ == "grid":
-            rows = p["rows"]
-            cols = p["cols"]
-            cell = p["cell_size"]
-            x0, y0 = p["x"], p["y"]
-
-            for r in range(rows + 1):
-                t.penup()
-                t.goto(x0, y0 - r * cell)
-                t.pendown()
-                t.forward(cols * cell)
-
-            for c in range(cols + 1):
-                t.penup()
-                t.goto(x0 + c * cell, y0)
-                t.pendown()
-                t.setheading(-90)
-                t.forward(rows * cell)
-
-        elif typ == "random_walk":
-            for _ in range(p["steps"]):
-                t.setheading(random.choice([0, 90, 180, 270]))
-                t.forward(p["step_len"])
-
-        t.penup()
+    #Tk option list per (kind, color, width) draw state, built once; a filled
+    #shape alternates fill and line items, so this can't just be the last one
+    def item_options(self, kind, color, w):
+        style = (kind, color, w)
+        opts = self.styles.get(style)
+        if opts is None:
+            c = resolve_color(color, self.canvas)
+            if kind == "fill":
+                opts = ("polygon", ("-fill", c, "-outline", ""))
+            else:
+                opts = ("line", ("-fill", c, "-width", w, "-capstyle", "round"))
+            self.styles[style] = opts
+        return opts
+
+    #turtle space (y up) -> canvas scrollregion (y down), same as TurtleScreen.
+    #goes straight to the Tcl command: create_polygon/create_line rebuild the
+    #option list from kwargs on every call
+    def draw_object(self, o, tag=None):
+        call = self.canvas.tk.call
+        w = self.canvas._w
+        tags = "shape " + tag if tag else "shape"
+        for kind, coords, color, width in compile_object(o):
+            cl = coords[:]
+            cl[1::2] = [-v for v in coords[1::2]]
+            item, opts = self.item_options(kind, color, width)
+            call(w, "create", item, *cl, *opts, "-tags", tags)
+
+    #progressive redraw: back-to-front in slices of REDRAW_SLICE_MS, yielding
+    #to the event loop in between so input keeps flowing. self.job is set
+    #for as long as a redraw is in flight
+    def draw_objects(self, objects):
+        self.reset()
+        self.objects = objects
+        self.pos = 0
+        #slices start at once; the pool fills the cache ahead of them and
+        #whatever it hasn't reached is tessellated serially by compile_object.
+        #a prefetch still running (a previous frame's) isn't queued behind
+        if self.prefetch is None or self.prefetch.done():
+            self.prefetch = _prefetch_thread.submit(prefetch_geometry, objects)
+        self.draw_slice()
+
+    def draw_slice(self):
+        self.job = None
+        deadline = time.perf_counter() + REDRAW_SLICE_MS / 1000
+        objs = self.objects
+        i = self.pos
+        while i < len(objs):
+            self.draw_object(objs[i], "o%d" % i)
+            i += 1
+            if time.perf_counter() >= deadline:
+                break
+        self.pos = i
+        if i < len(objs):
+            self.job = self.canvas.after(1, self.draw_slice)
 
 
 #shape config
@@ -256,6 +1569,12 @@ class ShapeDialog(tk.Toplevel):
             messagebox.showerror("Error", "Invalid input.")
             return
 
+        try:
+            resolve_colors([s], self)
+        except ValueError:
+            messagebox.showerror("Error", "Invalid color.")
+            return
+
         if s["type"] == "rectangle":
             try:
                 s["width"] = float(self.w.get())
@@ -362,6 +1681,12 @@ class PatternDialog(tk.Toplevel):
             messagebox.showerror("Error", "Invalid base values.")
             return
 
+        try:
+            resolve_colors([p], self)
+        except ValueError:
+            messagebox.showerror("Error", "Invalid color.")
+            return
+
         t = p["type"]
 
         try:
@@ -388,6 +1713,7 @@ class PatternDialog(tk.Toplevel):
             elif t == "random_walk":
                 p["steps"] = int(self.steps.get())
                 p["step_len"] = float(self.slen.get())
+                p["seed"] = random.randrange(1 << 30)
 
         except Exception:
             messagebox.showerror("Error", "Invalid pattern values.")
@@ -402,13 +1728,16 @@ class DesignFrame(ttk.Frame):
     def __init__(self, parent, app):
         self.color_cycle_running = False
         self.color_cycle_hue = 0
+        self.play_job = None
 
         super().__init__(parent)
         self.app = app
 
         self.project_name = None
+        self.project_version = None
         self.objects = []
 
+        self.scene = SceneBounds()
         self.dragging_index = None
         self.offset_x = 0
         self.offset_y = 0
@@ -439,6 +1768,8 @@ class DesignFrame(ttk.Frame):
 
         btn("Draw Shape", self.draw_shape)
         btn("Draw Pattern", self.draw_pattern)
+        btn("Group", self.group_objects)
+        btn("Ungroup", self.ungroup_object)
         btn("Background Color", self.bg_color)
         btn("Animation", self.animation)
         btn("Undo", self.undo)
@@ -460,75 +1791,43 @@ class DesignFrame(ttk.Frame):
     def to_turtle(self, cx, cy):
         return cx - 425, 300 - cy
 
-    #hitbox drag
-    def hit(self, obj, x, y):
-        t = obj["type"]
-        if t in ["square", "triangle", "star", "polygon", "circle"]:
-            r = obj.get("size", 50)
-            return (obj["x"] - r <= x <= obj["x"] + r) and (
-                obj["y"] - r <= y <= obj["y"] + r
-            )
-        if t == "rectangle":
-            w = obj["width"]
-            h = obj["height"]
-            return (obj["x"] - w <= x <= obj["x"] + w) and (
-                obj["y"] - h <= y <= obj["y"] + h
-            )
-        return False
-
     #drag
     def drag_start(self, e):
         tx, ty = self.to_turtle(e.x, e.y)
         for i, o in enumerate(reversed(self.objects)):
-            if o["kind"] == "shape" and self.hit(o, tx, ty):
+            if o["kind"] != "pattern" and self.scene.hit(o, tx, ty):
                 self.dragging_index = len(self.objects) - 1 - i
                 self.offset_x = o["x"] - tx
                 self.offset_y = o["y"] - ty
+                self.canvas_mgr.canvas.tag_raise("o%d" % self.dragging_index)
                 return
 
+    #only the dragged object's items move, nothing is redrawn
     def drag_move(self, e):
         if self.dragging_index is None:
             return
         tx, ty = self.to_turtle(e.x, e.y)
         o = self.objects[self.dragging_index]
-        o["x"] = tx + self.offset_x
-        o["y"] = ty + self.offset_y
-        self.fast_redraw(self.dragging_index)
+        x = tx + self.offset_x
+        y = ty + self.offset_y
+        tag = "o%d" % self.dragging_index
+        self.canvas_mgr.canvas.move(tag, x - o["x"], o["y"] - y)
+        o["x"] = x
+        o["y"] = y
+        self.scene.invalidate(o)
 
     def drag_stop(self, e):
         self.dragging_index = None
 
-    def fast_redraw(self, dragging=None):
-        mgr = self.canvas_mgr
-        mgr.reset()
-
-        for i, o in enumerate(self.objects):
-            if i == dragging:
-                continue
-            if o["kind"] == "shape":
-                mgr.draw_shape(o)
-            else:
-                mgr.draw_pattern(o)
-
-        if dragging is not None:
-            o = self.objects[dragging]
-            if o["kind"] == "shape":
-                mgr.draw_shape(o)
-            else:
-                mgr.draw_pattern(o)
-
-        mgr.screen.update()
-
     #redraw
+    #edits invalidate or forget the nodes they touch, so the boxes of
+    #everything else (a big group's members included) survive the redraw
     def redraw(self):
-        mgr = self.canvas_mgr
-        mgr.reset()
-        for o in self.objects:
-            if o["kind"] == "shape":
-                mgr.draw_shape(o)
-            else:
-                mgr.draw_pattern(o)
-        mgr.screen.update()
+        self.canvas_mgr.draw_objects(self.objects)
+
+    def moved(self, objects):
+        for o in objects:
+            self.scene.invalidate(o)
 
     #shape & pattern
     def draw_shape(self):
@@ -545,37 +1844,88 @@ class DesignFrame(ttk.Frame):
             self.objects.append(dlg.result)
             self.redraw()
 
+    #group
+    def group_objects(self):
+        if len(self.objects) < 2:
+            messagebox.showerror("Error", "Need at least two objects")
+            return
+        n = simpledialog.askinteger(
+            "Group",
+            "Group how many of the latest objects?",
+            minvalue=2,
+            maxvalue=len(self.objects),
+        )
+        if not n:
+            return
+
+        self.stop_animation()
+        members = self.objects[-n:]
+        boxes = [b for b in map(self.scene.bounds, members) if b]
+        x = y = 0.0
+        if boxes:
+            x = (min(b[0] for b in boxes) + max(b[2] for b in boxes)) / 2
+            y = (min(b[1] for b in boxes) + max(b[3] for b in boxes)) / 2
+        self.objects[-n:] = [make_group(members, x, y)]
+        for o in members:
+            self.scene.forget(o)
+        self.redraw()
+
+    def ungroup_object(self):
+        for i in range(len(self.objects) - 1, -1, -1):
+            if self.objects[i]["kind"] == "group":
+                self.stop_animation()
+                self.scene.forget(self.objects[i])
+                self.objects[i : i + 1] = ungroup(self.objects[i])
+                self.redraw()
+                return
+        messagebox.showerror("Error", "No group to ungroup")
+
     #background
     def bg_color(self):
         c = simpledialog.askstring("Background", "Enter color:")
         if not c:
             return
         try:
-            self.canvas_mgr.screen.bgcolor(c)
-            self.canvas_mgr.screen.update()
-        except Exception:
+            c = resolve_color(c, self)
+        except ValueError:
             messagebox.showerror("Error", "Invalid color")
+            return
+        self.canvas_mgr.screen.bgcolor(c)
+        self.canvas_mgr.screen.update()
     #rgb
     def run_color_cycle(self):
         if not self.color_cycle_running:
             return
-        
 
-        #inc hue
-        self.color_cycle_hue = (self.color_cycle_hue + 3) % 360
-        hue = self.color_cycle_hue / 360
+        #next hue only once the last one is fully on screen
+        if not self.canvas_mgr.job:
+            self.color_cycle_hue = (self.color_cycle_hue + 3) % 360
+            rgb = cycle_color(self.color_cycle_hue)
 
-        r, g, b = colorsys.hsv_to_rgb(hue, 1, 1)
-        rgb = "#%02x%02x%02x" % (int(r * 255), int(g * 255), int(b * 255))
-
-        
-        for o in self.objects:
-            if o["kind"] == "shape":
-                o["fill_color"] = rgb
+            for o in walk_objects(self.objects):
+                if o["kind"] == "shape":
+                    o["fill_color"] = rgb
 
-        self.redraw()
+            self.redraw()
         self.after(20, self.run_color_cycle)
 
+    #frame i+1 starts when frame i's redraw has finished, so every frame is
+    #shown in full and input keeps flowing between slices
+    def play(self, frames, step, i=0):
+        self.play_job = None
+        if self.canvas_mgr.job:
+            self.play_job = self.after(1, self.play, frames, step, i)
+            return
+        if i < frames:
+            step(i)
+            self.play_job = self.after(1, self.play, frames, step, i + 1)
+
+    def stop_animation(self):
+        self.color_cycle_running = False
+        if self.play_job:
+            self.after_cancel(self.play_job)
+            self.play_job = None
+
     def animation(self):
         mode = simpledialog.askstring(
             "Animation",
@@ -586,85 +1936,81 @@ class DesignFrame(ttk.Frame):
         mode = mode.lower()
 
         if mode == "rotate":
-            self.color_cycle_running = False
-            for _ in range(36):
-                for o in self.objects:
-                    o["heading"] = o.get("heading", 0) + 10
+            self.stop_animation()
+
+            def step(i):
+                rotate_objects(self.objects, 10)
+                self.moved(self.objects)
                 self.redraw()
-                self.update()
+
+            self.play(36, step)
             return
 
         #move
         if mode == "move":
-            self.color_cycle_running = False
-            for _ in range(25):
-                for o in self.objects:
-                    o["x"] += 10
+            self.stop_animation()
+
+            def step(i):
+                translate_objects(self.objects, 10, 0)
+                self.moved(self.objects)
                 self.redraw()
-                self.update()
+
+            self.play(25, step)
             return
 
         #expand
         if mode == "expand":
-            self.color_cycle_running = False
-            for _ in range(15):
-                for o in self.objects:
-                    if o["kind"] == "shape":
-                        if o["type"] == "rectangle":
-                            o["width"] *= 1.05
-                            o["height"] *= 1.05
-                        else:
-                            o["size"] *= 1.05
+            self.stop_animation()
+
+            def step(i):
+                shapes = select_objects(self.objects, kind=("shape", "group"))
+                scale_objects(self.objects, 1.05, indices=shapes)
+                self.moved(self.objects[j] for j in shapes)
                 self.redraw()
-                self.update()
+
+            self.play(15, step)
             return
 
         #minimize
         if mode == "contract":
-            self.color_cycle_running = False
-            for _ in range(15):
-                for o in self.objects:
-                    if o["kind"] == "shape":
-                        if o["type"] == "rectangle":
-                            o["width"] *= 0.95
-                            o["height"] *= 0.95
-                        else:
-                            o["size"] *= 0.95
+            self.stop_animation()
+
+            def step(i):
+                shapes = select_objects(self.objects, kind=("shape", "group"))
+                scale_objects(self.objects, 0.95, indices=shapes)
+                self.moved(self.objects[j] for j in shapes)
                 self.redraw()
-                self.update()
+
+            self.play(15, step)
             return
 
         #rgb
         if mode == "color_cycle":
             if not self.color_cycle_running:
+                self.stop_animation()
                 self.color_cycle_running = True
                 self.color_cycle_hue = 0
                 self.run_color_cycle()
             return
 
-
-
-
         #blink
         if mode == "blink":
-            self.color_cycle_running = False
-            backup = [dict(o) for o in self.objects]
+            self.stop_animation()
 
-            for i in range(10):
+            def step(i):
                 if i % 2 == 0:
                     self.canvas_mgr.clear()
                 else:
                     self.redraw()
-                self.update()
 
-            self.objects = backup
-            self.redraw()
+            self.play(10, step)
             return
 
     #undo
     def undo(self):
         if self.objects:
-            self.objects.pop()
+            self.stop_animation()
+            self.scene.forget(self.objects.pop())
             self.redraw()
 
     #save
@@ -679,11 +2025,31 @@ class DesignFrame(ttk.Frame):
             if not name:
                 return
             self.project_name = name
+            self.project_version = None
 
-        path = os.path.join(get_user_project_dir(user), self.project_name + ".json")
+        d = get_user_project_dir(user)
+        fname = self.project_name + ".json"
+        path = os.path.join(d, fname)
 
-        with open(path, "w") as f:
-            json.dump({"objects": self.objects}, f, indent=2)
+        try:
+            self.project_version = save_project_file(
+                path, self.objects, self.project_version
+            )
+        except SaveConflict as e:
+            if not messagebox.askyesno(
+                "Conflict",
+                f"{fname} was changed or created by someone else since you "
+                "opened it.\nOverwrite their version?",
+            ):
+                return
+            try:
+                self.project_version = save_project_file(
+                    path, self.objects, e.version
+                )
+            except SaveConflict:
+                messagebox.showerror("Error", f"{fname} changed again, not saved")
+                return
+        update_index_entry(d, fname, self.objects, widget=self)
 
         messagebox.showinfo("Saved", path)
 
@@ -699,15 +2065,24 @@ class DesignFrame(ttk.Frame):
             return
 
         self.project_name = name
+        self.project_version = None
         self.save_project()
 
     #load
     def load_project(self, path):
-        with open(path, "r") as f:
-            data = json.load(f)
-        self.objects = data.get("objects", [])
+        objects, version = load_project_file(path)
+        seed_walks(objects)
+        try:
+            resolve_colors(objects, self)
+        except ValueError as e:
+            messagebox.showerror("Error", f"Can't open project: {e}")
+            return False
+        self.stop_animation()
+        self.objects, self.project_version = objects, version
+        self.scene.clear()
         self.project_name = os.path.splitext(os.path.basename(path))[0]
         self.redraw()
+        return True
 
 #gallery
 class GalleryFrame(ttk.Frame):
@@ -725,52 +2100,181 @@ class GalleryFrame(ttk.Frame):
             header, text="Back", command=lambda: app.show_frame("DashboardFrame")
         ).pack(side="right")
 
+        tools = ttk.Frame(self, padding=(10, 0, 10, 10))
+        tools.pack(fill="x")
+
+        self.index = {}
+        self.sort_var = tk.StringVar(value="name")
+        self.filter_var = tk.StringVar()
+
+        ttk.Label(tools, text="Sort:").pack(side="left")
+        ttk.OptionMenu(
+            tools,
+            self.sort_var,
+            "name",
+            *GALLERY_SORTS,
+            command=lambda _: self.refresh_list(),
+        ).pack(side="left")
+        ttk.Label(tools, text="Filter:").pack(side="left", padx=(15, 0))
+        ttk.Entry(tools, textvariable=self.filter_var).pack(side="left", padx=5)
+        self.filter_var.trace_add("write", lambda *_: self.refresh_list())
+
         main = ttk.Frame(self)
         main.pack(expand=True, fill="both")
 
-        self.listbox = tk.Listbox(main, width=30)
-        self.listbox.pack(side="left", fill="y", padx=10)
+        left = ttk.Frame(main)
+        left.pack(side="left", fill="y", padx=10)
+
+        self.listbox = tk.Listbox(left, width=30)
+        self.listbox.pack(fill="y", expand=True)
         self.listbox.bind("<<ListboxSelect>>", self.preview)
 
+        self.info = ttk.Label(left, text="", justify="left", wraplength=220)
+        self.info.pack(fill="x", pady=5)
+
         prev = ttk.Frame(main)
         prev.pack(side="right", expand=True, fill="both")
         ttk.Label(prev, text="Preview", font=("Segoe UI", 14, "bold")).pack()
 
         self.preview_canvas = TurtleCanvasManager(prev)
 
+        self.watcher = None
+        self.watch_job = None
+        self.previews = {}
+        self.current = None
+
     def on_show(self):
-        self.listbox.delete(0, tk.END)
         user = self.app.logged_in_user
         if not user:
+            self.listbox.delete(0, tk.END)
             return
 
+        #a running watcher already kept the index and list current
         d = get_user_project_dir(user)
-        for f in os.listdir(d):
-            if f.endswith(".json"):
-                self.listbox.insert(tk.END, f)
-
+        if self.watcher is None or self.watcher.path != d:
+            self.stop_watching()
+            #only kept once the scan went through, so a failed scan is retried
+            #on the next visit instead of leaving an empty list for good
+            watcher = DirectoryWatcher(d)
+            try:
+                self.index = scan_index(d, self)
+            except BaseException:
+                watcher.close()
+                raise
+            self.watcher = watcher
+            self.previews = {}
+            self.refresh_list()
+            self.watch_job = self.after(WATCH_INTERVAL_MS, self.poll_watcher)
+
+        self.current = None
+        self.listbox.selection_clear(0, tk.END)
+        self.info.config(text="")
         self.preview_canvas.clear()
 
+    def stop_watching(self):
+        if self.watch_job:
+            self.after_cancel(self.watch_job)
+            self.watch_job = None
+        if self.watcher:
+            self.watcher.close()
+            self.watcher = None
+
+    def poll_watcher(self):
+        user = self.app.logged_in_user
+        if not user or os.path.join(PROJECTS_DIR, user) != self.watcher.path:
+            self.watch_job = None
+            self.stop_watching()
+            return
+
+        #rescheduled even if an event fails, live refresh must not stop
+        try:
+            for event, fname in self.watcher.poll():
+                self.apply_event(event, fname)
+        finally:
+            self.watch_job = self.after(WATCH_INTERVAL_MS, self.poll_watcher)
+
+    def apply_event(self, event, fname):
+        d = self.watcher.path
+        self.previews.pop(fname, None)
+
+        if event == "deleted":
+            remove_index_entry(d, fname, self.index)
+        elif not index_is_current(d, self.index, fname):
+            #a save from the editor (or another instance) already indexed it
+            disk = load_index(d)
+            if index_is_current(d, disk, fname):
+                self.index[fname] = disk[fname]
+            else:
+                try:
+                    update_index_entry(d, fname, index=self.index, widget=self)
+                except Exception:
+                    #index busy or unwritable, the next event retries
+                    return
+
+        self.place_entry(fname)
+        if fname == self.current:
+            if fname in self.index:
+                self.show_preview(fname)
+            else:
+                self.current = None
+                self.info.config(text="")
+                self.preview_canvas.clear()
+
+    def place_entry(self, fname):
+        names = self.listbox.get(0, tk.END)
+        if fname in names:
+            self.listbox.delete(names.index(fname))
+
+        visible = gallery_names(
+            self.index, self.sort_var.get(), self.filter_var.get(), self
+        )
+        if fname in visible:
+            i = visible.index(fname)
+            self.listbox.insert(i, fname)
+            if fname == self.current:
+                self.listbox.selection_set(i)
+
+    def refresh_list(self):
+        self.listbox.delete(0, tk.END)
+        for f in gallery_names(
+            self.index, self.sort_var.get(), self.filter_var.get(), self
+        ):
+            self.listbox.insert(tk.END, f)
+
     def preview(self, _):
         if not self.listbox.curselection():
             return
 
         fname = self.listbox.get(self.listbox.curselection()[0])
+        self.show_preview(fname)
+
+    def show_preview(self, fname):
+        self.current = fname
         user = self.app.logged_in_user
         path = os.path.join(get_user_project_dir(user), fname)
 
-        with open(path, "r") as f:
-            data = json.load(f)
-
-        self.preview_canvas.reset()
+        meta = self.index.get(fname)
+        if meta:
+            types = ", ".join(f"{n} {t}" for t, n in meta["types"].items())
+            modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(meta["mtime"]))
+            self.info.config(
+                text=f"{meta['objects']} objects ({types})\n"
+                f"{meta['size']} bytes, modified {modified}"
+            )
 
-        for o in data.get("objects", []):
-            if o["kind"] == "shape":
-                self.preview_canvas.draw_shape(o)
-            else:
-                self.preview_canvas.draw_pattern(o)
+        objects = self.previews.get(fname)
+        if objects is None:
+            try:
+                objects = load_project_file(path)[0]
+                seed_walks(objects)
+                resolve_colors(objects, self)
+            except Exception as e:
+                self.preview_canvas.clear()
+                self.info.config(text=f"Can't preview: {e}")
+                return
+            self.previews[fname] = objects
 
-        self.preview_canvas.screen.update()
+        self.preview_canvas.draw_objects(objects)
 
 
 #dashboard
@@ -819,8 +2323,8 @@ class DashboardFrame(ttk.Frame):
         if not path:
             return
 
-        self.app.frames["DesignFrame"].load_project(path)
-        self.app.show_frame("DesignFrame")
+        if self.app.frames["DesignFrame"].load_project(path):
+            self.app.show_frame("DesignFrame")
 
 #login page
 class LoginFrame(ttk.Frame):
@@ -897,13 +2401,9 @@ class ShapeCraftApp(tk.Tk):
             messagebox.showerror("Error", "Username/password required")
             return
 
-        users = load_users()
-        if u in users:
+        if not add_user(u, p):
             messagebox.showerror("Error", "Username exists")
             return
-
-        users[u] = {"password": p}
-        save_users(users)
         messagebox.showinfo("Success", "Account created")
 
     def logout(self):
@@ -911,7 +2411,526 @@ class ShapeCraftApp(tk.Tk):
         self.show_frame("LoginFrame")
 
 
+#render service
+#jobs are JSONL lines: {"id", "project" | "objects" | "path", "output"?,
+#"width"?, "height"?, "bg"?, "scale"?}; {"op": "stats"} reports counters.
+#any local account can reach the TCP port, so "path" must lie in the
+#projects tree and "output" is taken relative to the service's out_dir
+def inside(root, path):
+    full = os.path.realpath(os.path.join(root, path))
+    base = os.path.realpath(root)
+    if os.path.commonpath([full, base]) != base:
+        raise ValueError(f"{path!r} is outside {root}")
+    return full
+
+
+def job_spec(job):
+    if job.get("path"):
+        with open(inside(PROJECTS_DIR, os.path.abspath(job["path"])), "r") as f:
+            objects = json.load(f).get("objects", [])
+    elif "project" in job:
+        objects = job["project"].get("objects", [])
+    else:
+        objects = job.get("objects", [])
+    #bad colors fail the job here rather than inside a pool worker
+    seed_walks(objects)
+    resolve_colors(objects)
+    return {
+        "objects": objects,
+        "width": int(job.get("width", 850)),
+        "height": int(job.get("height", 600)),
+        "bg": resolve_color(job.get("bg", "white")),
+        "scale": float(job.get("scale", 1.0)),
+    }
+
+
+def spec_key(spec):
+    blob = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def render_spec(spec):
+    return render_png(
+        spec["objects"], spec["width"], spec["height"], spec["bg"], spec["scale"]
+    )
+
+
+class RenderService:
+    def __init__(self, workers=None, queue_size=256, cache_size=512, out_dir="renders"):
+        self.workers = workers or os.cpu_count() or 2
+        self.queue_size = queue_size
+        self.cache_size = cache_size
+        self.out_dir = out_dir
+
+        self.cache = OrderedDict()
+        self.inflight = {}
+        self.latencies = deque(maxlen=2000)
+        self.rendered = 0
+        self.cache_hits = 0
+        self.failed = 0
+
+    async def start(self, host="127.0.0.1", port=8765, socket_path=None):
+        os.makedirs(self.out_dir, exist_ok=True)
+        #spawned workers don't inherit the client sockets a fork would copy
+        self.pool = ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.queue_size)
+        self.runners = [
+            asyncio.create_task(self.run_jobs()) for _ in range(self.workers * 2)
+        ]
+        if socket_path:
+            #owner-only from the moment it is bound
+            mask = os.umask(0o177)
+            try:
+                return await asyncio.start_unix_server(self.handle, path=socket_path)
+            finally:
+                os.umask(mask)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        for r in self.runners:
+            r.cancel()
+        self.pool.shutdown(cancel_futures=True)
+
+    def stats(self):
+        lat = sorted(self.latencies)
+        return {
+            "queue_depth": self.queue.qsize(),
+            "inflight": len(self.inflight),
+            "rendered": self.rendered,
+            "cache_hits": self.cache_hits,
+            "failed": self.failed,
+            "latency_ms": {
+                "mean": round(sum(lat) / len(lat), 2) if lat else 0,
+                "p50": lat[len(lat) // 2] if lat else 0,
+                "p95": lat[int(len(lat) * 0.95)] if lat else 0,
+            },
+        }
+
+    async def run_jobs(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            spec, fut = await self.queue.get()
+            try:
+                png = await loop.run_in_executor(self.pool, render_spec, spec)
+                fut.set_result(png)
+            except Exception as e:
+                fut.set_exception(e)
+            finally:
+                self.queue.task_done()
+
+    async def render(self, spec):
+        key = spec_key(spec)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            return key, self.cache[key], True
+
+        #identical jobs already queued share one render
+        fut = self.inflight.get(key)
+        if fut is None:
+            fut = asyncio.get_running_loop().create_future()
+            self.inflight[key] = fut
+            try:
+                self.queue.put_nowait((spec, fut))
+                png = await fut
+            finally:
+                del self.inflight[key]
+            self.rendered += 1
+            self.cache[key] = png
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return key, png, False
+
+        self.cache_hits += 1
+        return key, await asyncio.shield(fut), True
+
+    async def process(self, job):
+        t0 = time.perf_counter()
+        res = {"id": job.get("id")}
+        try:
+            key, png, cached = await self.render(job_spec(job))
+            out = inside(self.out_dir, job.get("output") or key + ".png")
+            with open(out, "wb") as f:
+                f.write(png)
+            res.update(ok=True, output=out, key=key, cached=cached)
+        except Exception as e:
+            self.failed += 1
+            res.update(ok=False, error=str(e))
+        ms = round((time.perf_counter() - t0) * 1000, 2)
+        self.latencies.append(ms)
+        res.update(latency_ms=ms, queue_depth=self.queue.qsize())
+        return res
+
+    async def handle(self, reader, writer):
+        pending = set()
+        lock = asyncio.Lock()
+
+        async def reply(res):
+            async with lock:
+                writer.write((json.dumps(res) + "\n").encode())
+                await writer.drain()
+
+        async def run(job):
+            try:
+                res = await self.process(job)
+                try:
+                    await reply(res)
+                except ConnectionError:
+                    pass  #client went away, the render is still cached
+            finally:
+                self.slots.release()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    job = json.loads(line)
+                except ValueError:
+                    await reply({"ok": False, "error": "invalid JSON"})
+                    continue
+                if not isinstance(job, dict):
+                    await reply({"ok": False, "error": "job must be a JSON object"})
+                    continue
+                if job.get("op") == "stats":
+                    await reply(self.stats())
+                    continue
+
+                #no free slot -> stop reading, the client blocks on its socket
+                await self.slots.acquire()
+                task = asyncio.create_task(run(job))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except ConnectionError:
+            pass
+        finally:
+            if pending:
+                await asyncio.gather(*pending)
+            writer.close()
+
+
+async def serve(args):
+    svc = RenderService(args.workers, args.queue_size, args.cache_size, args.out_dir)
+    server = await svc.start(args.host, args.port, args.socket)
+    where = args.socket or f"{args.host}:{args.port}"
+    print(f"render service on {where}, {svc.workers} workers")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        svc.close()
+
+
+async def submit(args):
+    if args.socket:
+        reader, writer = await asyncio.open_unix_connection(args.socket)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+
+    async def send():
+        with open(args.jobs, "r") as f:
+            for line in f:
+                if line.strip():
+                    writer.write(line.rstrip("\n").encode() + b"\n")
+                    await writer.drain()
+        writer.write_eof()
+
+    sender = asyncio.create_task(send())
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        print(line.decode().rstrip())
+    await sender
+    writer.close()
+
+
+#recorder
+_record_job = None
+
+
+def _init_recorder(job):
+    global _record_job
+    _init_worker()
+    _record_job = job
+
+
+def _record_frame(i):
+    job = _record_job
+    objs = animation_frame(job["objects"], job["mode"], i)
+    w, h = job["width"], job["height"]
+    if job["gif"]:
+        buf, palette = render_indexed(objs, w, h, job["bg"], job["scale"])
+        return gif_frame(w, h, buf, palette, job["delay"])
+    path = os.path.join(job["output"], "frame_%04d.png" % i)
+    with open(path, "wb") as f:
+        f.write(encode_png(w, h, render_rgb(objs, w, h, job["bg"], job["scale"])))
+    return path
+
 
-load_users()
-app = ShapeCraftApp()
-app.mainloop()
+def record_animation(
+    objects,
+    mode,
+    output,
+    frames=None,
+    fps=25,
+    width=850,
+    height=600,
+    bg="white",
+    scale=1.0,
+    workers=None,
+):
+    #output ending in .gif -> animated GIF, otherwise a folder of PNG frames
+    if mode not in ANIMATION_FRAMES:
+        raise ValueError(f"unknown animation: {mode}")
+    #fail here rather than in every worker
+    validate_colors(objects)
+    resolve_color(bg)
+    frames = frames or ANIMATION_FRAMES[mode]
+    gif = output.lower().endswith(".gif")
+    if not gif:
+        os.makedirs(output, exist_ok=True)
+
+    job = {
+        "objects": objects,
+        "mode": mode,
+        "output": output,
+        "gif": gif,
+        "width": width,
+        "height": height,
+        "bg": bg,
+        "scale": scale,
+        #GIF delays are in 1/100 s
+        "delay": max(round(100 / fps), 1),
+    }
+    workers = workers or os.cpu_count() or 2
+    with ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_recorder,
+        initargs=(job,),
+    ) as pool:
+        chunk = max(frames // (workers * 4), 1)
+        results = pool.map(_record_frame, range(frames), chunksize=chunk)
+        if not gif:
+            return list(results)
+        with open(output, "wb") as f:
+            f.write(gif_header(width, height))
+            for block in results:
+                f.write(block)
+            f.write(b"\x3b")
+    return output
+
+
+#store stress test
+def _stress_worker(root, worker, ops):
+    #alternates registering a fresh user and appending to one shared project,
+    #retrying saves that lose the version race
+    os.chdir(root)
+    path = os.path.join(PROJECTS_DIR, "shared.json")
+    conflicts = 0
+    for i in range(ops):
+        if i % 2 == 0:
+            add_user(f"u{worker}_{i}", "pw")
+            continue
+        while True:
+            try:
+                objects, version = load_project_file(path)
+            except FileNotFoundError:
+                objects, version = [], None
+            objects.append({"kind": "shape", "type": "square", "x": worker, "y": i})
+            try:
+                save_project_file(path, objects, version)
+                break
+            except SaveConflict:
+                conflicts += 1
+    return conflicts
+
+
+def run_store_stress(procs=8, ops=200):
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, PROJECTS_DIR))
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(
+            procs, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            futs = [pool.submit(_stress_worker, root, w, ops) for w in range(procs)]
+            conflicts = sum(f.result() for f in futs)
+        elapsed = time.perf_counter() - t0
+
+        with open(os.path.join(root, USERS_FILE), "r") as f:
+            users = json.load(f)
+        shared = os.path.join(root, PROJECTS_DIR, "shared.json")
+        objects, version = load_project_file(shared)
+
+    saves = procs * (ops // 2)
+    registers = procs * (ops - ops // 2)
+    return {
+        "ops_per_s": round(procs * ops / elapsed, 1),
+        "seconds": round(elapsed, 2),
+        "conflict_retries": conflicts,
+        "users": f"{len(users)}/{registers}",
+        "objects": f"{len(objects)}/{saves}",
+        "version": version,
+        "lost": registers - len(users) + saves - len(objects),
+    }
+
+
+#cli
+def cmd_transform(args):
+    objects, version = load_project_file(args.project)
+
+    indices = select_objects(objects, kind=args.kind, types=args.type)
+    pivot = tuple(args.pivot) if args.pivot else None
+
+    if args.scale:
+        sx = args.scale[0]
+        sy = args.scale[1] if len(args.scale) > 1 else None
+        scale_objects(objects, sx, sy, pivot=pivot, indices=indices)
+    if args.rotate:
+        rotate_objects(objects, args.rotate, pivot=pivot, indices=indices)
+    if args.move:
+        translate_objects(objects, args.move[0], args.move[1], indices=indices)
+
+    #same locked, versioned save as the GUI, so an open editor sees the conflict
+    out = args.output or args.project
+    if out != args.project:
+        version = load_project_file(out)[1] if os.path.exists(out) else None
+    try:
+        save_project_file(out, objects, version)
+    except SaveConflict as e:
+        raise SystemExit(f"{e}, not saved")
+    print(f"{len(indices)} objects transformed -> {out}")
+
+
+def cmd_render(args):
+    with open(args.project, "r") as f:
+        objects = json.load(f).get("objects", [])
+    seed_walks(objects)
+    png = render_png(objects, args.width, args.height, args.bg, args.scale)
+    out = args.output or os.path.splitext(args.project)[0] + ".png"
+    with open(out, "wb") as f:
+        f.write(png)
+    print(out)
+
+
+def cmd_record(args):
+    with open(args.project, "r") as f:
+        objects = json.load(f).get("objects", [])
+    seed_walks(objects)
+    t0 = time.perf_counter()
+    record_animation(
+        objects,
+        args.mode,
+        args.output,
+        args.frames,
+        args.fps,
+        args.width,
+        args.height,
+        args.bg,
+        args.scale,
+        args.workers,
+    )
+    print(f"{args.output} in {time.perf_counter() - t0:.1f}s")
+
+
+def cmd_stress(args):
+    res = run_store_stress(args.procs, args.ops)
+    print(json.dumps(res, indent=2))
+    if res["lost"]:
+        raise SystemExit(1)
+
+
+def cmd_serve(args):
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_submit(args):
+    asyncio.run(submit(args))
+
+
+def add_endpoint_args(p):
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--socket", help="unix socket path instead of TCP")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="shapecraft")
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("transform", help="move/rotate/scale objects in a project")
+    p.add_argument("project")
+    p.add_argument("-o", "--output", help="write here instead of in place")
+    p.add_argument("--kind", choices=["shape", "pattern"])
+    p.add_argument("--type", action="append", help="only this type (repeatable)")
+    p.add_argument("--move", nargs=2, type=float, metavar=("DX", "DY"))
+    p.add_argument("--rotate", type=float, metavar="DEG")
+    p.add_argument("--scale", nargs="+", type=float, metavar="S")
+    p.add_argument("--pivot", nargs=2, type=float, metavar=("X", "Y"))
+    p.set_defaults(func=cmd_transform)
+
+    p = sub.add_parser("render", help="render a project to PNG without the GUI")
+    p.add_argument("project")
+    p.add_argument("-o", "--output")
+    p.add_argument("--width", type=int, default=850)
+    p.add_argument("--height", type=int, default=600)
+    p.add_argument("--bg", default="white")
+    p.add_argument("--scale", type=float, default=1.0)
+    p.set_defaults(func=cmd_render)
+
+    p = sub.add_parser("record", help="render an animation to a GIF or PNG frames")
+    p.add_argument("project")
+    p.add_argument("mode", choices=list(ANIMATION_FRAMES))
+    p.add_argument("-o", "--output", required=True, help="out.gif or a directory")
+    p.add_argument("--frames", type=int)
+    p.add_argument("--fps", type=float, default=25)
+    p.add_argument("--width", type=int, default=850)
+    p.add_argument("--height", type=int, default=600)
+    p.add_argument("--bg", default="white")
+    p.add_argument("--scale", type=float, default=1.0)
+    p.add_argument("--workers", type=int)
+    p.set_defaults(func=cmd_record)
+
+    p = sub.add_parser("stress", help="hammer users.json/project saves from processes")
+    p.add_argument("--procs", type=int, default=8)
+    p.add_argument("--ops", type=int, default=200, help="operations per process")
+    p.set_defaults(func=cmd_stress)
+
+    p = sub.add_parser("serve", help="local render service for JSONL jobs")
+    add_endpoint_args(p)
+    p.add_argument("--workers", type=int)
+    p.add_argument("--queue-size", type=int, default=256)
+    p.add_argument("--cache-size", type=int, default=512)
+    p.add_argument("--out-dir", default="renders")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("submit", help="send a JSONL job file to the render service")
+    p.add_argument("jobs")
+    add_endpoint_args(p)
+    p.set_defaults(func=cmd_submit)
+
+    args = parser.parse_args(argv)
+    if args.command == "transform" and args.scale and len(args.scale) > 2:
+        parser.error("--scale takes S or SX SY")
+    if args.command is None:
+        load_users()
+        app = ShapeCraftApp()
+        app.mainloop()
+        return
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()